@@ -1,5 +1,7 @@
 from collections import OrderedDict
 
+_MISSING = object()
+
 
 class LRUDict(OrderedDict):
     """
@@ -17,15 +19,14 @@ class LRUDict(OrderedDict):
         return value
 
     def __setitem__(self, key, value):
-        if key in self:
-            self.move_to_end(key)
         super().__setitem__(key, value)
+        self.move_to_end(key)
         if len(self) > self.max_items:
-            oldest = next(iter(self))
-            del self[oldest]
+            self.popitem(last=False)
 
-    def get(self, key, *args, **kwargs):
-        item = super(LRUDict, self).get(key, *args, **kwargs)
-        if item:
-            self.move_to_end(key=key)
+    def get(self, key, default=None):
+        item = super().get(key, _MISSING)
+        if item is _MISSING:
+            return default
+        self.move_to_end(key)
         return item
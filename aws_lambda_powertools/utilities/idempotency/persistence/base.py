@@ -2,13 +2,15 @@
 Persistence layers supporting idempotency
 """
 
-import datetime
+import functools
 import hashlib
 import json
 import logging
+import math
+import time
 from abc import ABC, abstractmethod
 from types import MappingProxyType
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
 
 import jmespath
 
@@ -17,12 +19,110 @@ from aws_lambda_powertools.shared.json_encoder import Encoder
 from aws_lambda_powertools.utilities.idempotency.exceptions import (
     IdempotencyInvalidStatusError,
     IdempotencyItemAlreadyExistsError,
+    IdempotencyItemNotFoundError,
     IdempotencyValidationError,
 )
 
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
-STATUS_CONSTANTS = MappingProxyType({"INPROGRESS": "INPROGRESS", "COMPLETED": "COMPLETED", "EXPIRED": "EXPIRED"})
+_INPROGRESS = "INPROGRESS"
+_COMPLETED = "COMPLETED"
+_EXPIRED = "EXPIRED"
+_VALID_STATUSES = frozenset((_INPROGRESS, _COMPLETED, _EXPIRED))
+
+# Public mapping kept for callers outside this module; hot paths here use the plain constants above to avoid
+# the MappingProxy lookup per record write
+STATUS_CONSTANTS = MappingProxyType({"INPROGRESS": _INPROGRESS, "COMPLETED": _COMPLETED, "EXPIRED": _EXPIRED})
+
+# md5 remains the default so that idempotency keys stored by existing deployments keep matching. Faster,
+# non-cryptographic alternatives ("xxh3_128", "blake3") can be opted into via the hash_function parameter.
+DEFAULT_HASH_FUNCTION = "md5"
+
+# How long a failed record lookup is remembered by the local negative cache. Kept short: a miss only stays
+# valid until another execution environment stores the record.
+NEGATIVE_CACHE_TTL_SECONDS = 1
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_jmespath(expression: str):
+    """
+    Compile a jmespath expression, memoized so that persistence layers created with the same expressions
+    (e.g. one instance per tenant) don't re-parse it on every instantiation
+    """
+    return jmespath.compile(expression)
+
+
+_encoder_default = Encoder().default
+
+
+def _json_default(obj):
+    """
+    Serializer hook for types the hash encoders don't handle natively, reusing the Encoder rules.
+
+    Non-finite Decimals (NaN, Infinity) are normalized to None: the stdlib encoder would emit NaN or
+    Infinity literals where orjson emits null, so emitting null on both paths keeps hashes identical
+    whether or not the optional orjson package is installed.
+    """
+    value = _encoder_default(obj)
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+class _CanonicalEncoder(json.JSONEncoder):
+    """
+    JSONEncoder that serializes non-finite floats as null, matching orjson, so both serializers produce
+    identical bytes for payloads containing NaN or Infinity (which json.loads happily produces)
+    """
+
+    def iterencode(self, o, _one_shot=False):
+        markers = {} if self.check_circular else None
+
+        def floatstr(o, _repr=float.__repr__, _isfinite=math.isfinite):
+            return _repr(o) if _isfinite(o) else "null"
+
+        chunker = json.encoder._make_iterencode(
+            markers,
+            self.default,
+            json.encoder.encode_basestring,
+            self.indent,
+            floatstr,
+            self.key_separator,
+            self.item_separator,
+            self.sort_keys,
+            self.skipkeys,
+            _one_shot,
+        )
+        return chunker(o, 0)
+
+
+# Canonical form shared with the orjson path: sorted keys, compact separators and raw UTF-8, so both
+# serializers produce identical bytes and therefore identical hashes. default= keeps the Encoder type
+# handling without forcing the pure-Python encoder the way cls= would.
+_json_encoder = _CanonicalEncoder(default=_json_default, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+# Hot callables bound once at import so _generate_hash doesn't repeat the module/attribute lookups per call
+_iterencode = _json_encoder.iterencode
+if orjson:
+    _orjson_dumps = orjson.dumps
+    # OPT_PASSTHROUGH_DATETIME routes datetimes through _json_default, which rejects them with TypeError just
+    # like the stdlib path, instead of orjson silently serializing them to a format the fallback can't match
+    _ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
 
 
 class DataRecord:
@@ -30,6 +130,10 @@ class DataRecord:
     Data Class for idempotency records.
     """
 
+    # Records are held in the local cache, potentially hundreds per execution environment; slots avoid a
+    # per-instance __dict__ and make attribute access a fixed-offset lookup
+    __slots__ = ("idempotency_key", "payload_hash", "expiry_timestamp", "_status", "response_data")
+
     def __init__(
         self,
         idempotency_key,
@@ -59,17 +163,24 @@ class DataRecord:
         self._status = status
         self.response_data = response_data
 
-    @property
-    def is_expired(self) -> bool:
+    def is_expired(self, now: Optional[float] = None) -> bool:
         """
         Check if data record is expired
 
+        Parameters
+        ----------
+        now: float, optional
+            Current unix timestamp; pass it in when the caller has already read the clock for this request
+            to avoid repeated time.time() calls against the same record
+
         Returns
         -------
         bool
             Whether the record is currently expired or not
         """
-        return bool(self.expiry_timestamp and int(datetime.datetime.now().timestamp()) > self.expiry_timestamp)
+        if now is None:
+            now = time.time()
+        return bool(self.expiry_timestamp and now > self.expiry_timestamp)
 
     @property
     def status(self) -> str:
@@ -80,9 +191,9 @@ class DataRecord:
         -------
         str
         """
-        if self.is_expired:
-            return STATUS_CONSTANTS["EXPIRED"]
-        elif self._status in STATUS_CONSTANTS.values():
+        if self.is_expired():
+            return _EXPIRED
+        elif self._status in _VALID_STATUSES:
             return self._status
         else:
             raise IdempotencyInvalidStatusError(self._status)
@@ -111,7 +222,8 @@ class BasePersistenceLayer(ABC):
         expires_after_seconds: int = 60 * 60,  # 1 hour default
         use_local_cache: bool = False,
         local_cache_max_items: int = 256,
-        hash_function: str = "md5",
+        hash_function: str = DEFAULT_HASH_FUNCTION,
+        raw_string_hashing: bool = False,
     ) -> None:
         """
         Initialize the base persistence layer
@@ -129,20 +241,92 @@ class BasePersistenceLayer(ABC):
         local_cache_max_items: int, optional
             Max number of items to store in local cache, by default 1024
         hash_function: str, optional
-            Function to use for calculating hashes, by default md5.
+            Function to use for calculating hashes, by default md5. Any algorithm exposed by hashlib can be
+            used, as well as the faster non-cryptographic "xxh3_128" and "blake3" options, which require the
+            optional xxhash and blake3 packages respectively. Changing the hash function changes the
+            idempotency keys generated, so existing stored records will no longer match.
+        raw_string_hashing: bool, optional
+            Hash str and int data directly instead of JSON-serializing it first, by default False. Skips
+            serialization entirely when the event key jmespath selects a scalar (e.g. an order id), but
+            changes the hashes generated for those values, so don't enable it on a store with existing
+            records. bool is excluded from the fast path (despite being an int subclass) and keeps hashing
+            as JSON true/false.
         """
         self.event_key_jmespath = event_key_jmespath
         if self.event_key_jmespath:
-            self.event_key_compiled_jmespath = jmespath.compile(event_key_jmespath)
+            self.event_key_compiled_jmespath = _compile_jmespath(event_key_jmespath)
         self.expires_after_seconds = expires_after_seconds
         self.use_local_cache = use_local_cache
         if self.use_local_cache:
             self._cache = LRUDict(max_items=local_cache_max_items)
+            # Failed lookups are cached too, so a client hammering the same unknown key doesn't trigger a
+            # persistence store round-trip per retry
+            self._negative_cache = LRUDict(max_items=64)
+        # Short-lived memo of (idempotency key, payload hash) pairs keyed by event object id, so the several
+        # persistence calls made during a single invocation only serialize and hash the event once
+        self._event_hash_cache = LRUDict(max_items=4)
         self.payload_validation_enabled = False
         if payload_validation_jmespath:
-            self.validation_key_jmespath = jmespath.compile(payload_validation_jmespath)
+            self.validation_key_jmespath = _compile_jmespath(payload_validation_jmespath)
             self.payload_validation_enabled = True
-        self.hash_function = getattr(hashlib, hash_function)
+        # When both expressions are configured, a multiselect list extracts key and validation data in a
+        # single walk over the event instead of two separate searches
+        self._combined_jmespath = None
+        if self.event_key_jmespath and self.payload_validation_enabled:
+            self._combined_jmespath = _compile_jmespath(f"[{event_key_jmespath}, {payload_validation_jmespath}]")
+        self.hash_function = self._resolve_hash_function(hash_function)
+        # Fresh hashers are cloned from this prepared instance; copy() is cheaper than running the
+        # constructor on every _generate_hash call
+        self._base_hasher = self.hash_function()
+        self.raw_string_hashing = raw_string_hashing
+
+        # These settings are immutable after construction, so decide their per-request branches once here by
+        # binding specialized variants on the instance that skip the disabled paths entirely
+        if not self.use_local_cache:
+            self._save_to_cache = lambda data_record: None
+            self._retrieve_from_cache = lambda idempotency_key: None
+            self._delete_from_cache = lambda idempotency_key: None
+            self._check_negative_cache = lambda idempotency_key: None
+            self._save_to_negative_cache = lambda idempotency_key: None
+            self._delete_from_negative_cache = lambda idempotency_key: None
+        if not self.payload_validation_enabled:
+            self._validate_payload = lambda lambda_event, data_record: None
+            self._get_hashed_payload = lambda lambda_event: ""
+            if self.event_key_jmespath:
+                key_search = self.event_key_compiled_jmespath.search
+                self._compute_event_hashes = lambda lambda_event: (self._generate_hash(key_search(lambda_event)), "")
+            else:
+                self._compute_event_hashes = lambda lambda_event: (self._generate_hash(lambda_event), "")
+
+    @staticmethod
+    def _resolve_hash_function(hash_function: str):
+        """
+        Resolve hash function name to a hasher constructor
+
+        Parameters
+        ----------
+        hash_function: str
+            Name of the hash function, either a hashlib algorithm or one of "xxh3_128"/"blake3"
+
+        Returns
+        -------
+        Callable
+            Constructor returning hasher objects supporting update()/hexdigest()
+
+        Raises
+        ------
+        ImportError
+            "xxh3_128" or "blake3" was requested but the corresponding optional package is not installed
+        """
+        if hash_function == "xxh3_128":
+            if xxhash is None:
+                raise ImportError("The 'xxhash' package must be installed to use the xxh3_128 hash function")
+            return xxhash.xxh3_128
+        if hash_function == "blake3":
+            if blake3 is None:
+                raise ImportError("The 'blake3' package must be installed to use the blake3 hash function")
+            return blake3.blake3
+        return getattr(hashlib, hash_function)
 
     def _get_hashed_idempotency_key(self, lambda_event: Dict[str, Any]) -> str:
         """
@@ -159,10 +343,7 @@ class BasePersistenceLayer(ABC):
             Hashed representation of the data extracted by the jmespath expression
 
         """
-        data = lambda_event
-        if self.event_key_jmespath:
-            data = self.event_key_compiled_jmespath.search(lambda_event)
-        return self._generate_hash(data)
+        return self._get_event_hashes(lambda_event)[0]
 
     def _get_hashed_payload(self, lambda_event: Dict[str, Any]) -> str:
         """
@@ -181,8 +362,71 @@ class BasePersistenceLayer(ABC):
         """
         if not self.payload_validation_enabled:
             return ""
-        data = self.validation_key_jmespath.search(lambda_event)
-        return self._generate_hash(data)
+        return self._get_event_hashes(lambda_event)[1]
+
+    def _get_event_hashes(self, lambda_event: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Return the (idempotency key, payload hash) pair for lambda_event, computing it at most once per event
+
+        Parameters
+        ----------
+        lambda_event: Dict[str, Any]
+            Lambda event
+
+        Returns
+        -------
+        Tuple[str, str]
+            Hashed idempotency key and hashed validation payload ("" when payload validation is disabled)
+
+        """
+        cache_key = id(lambda_event)
+        entry = self._event_hash_cache.get(cache_key)
+        # The event is stored alongside its hashes: the strong reference keeps the object alive so CPython
+        # cannot recycle its id() for a different event while the entry exists, and the identity check makes
+        # any stale entry recompute instead of returning another event's hashes
+        if entry is not None and entry[0] is lambda_event:
+            return entry[1]
+        hashes = self._compute_event_hashes(lambda_event)
+        self._event_hash_cache[cache_key] = (lambda_event, hashes)
+        return hashes
+
+    def _compute_event_hashes(self, lambda_event: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Compute the (idempotency key, payload hash) pair for lambda_event
+
+        Parameters
+        ----------
+        lambda_event: Dict[str, Any]
+            Lambda event
+
+        Returns
+        -------
+        Tuple[str, str]
+            Hashed idempotency key and hashed validation payload ("" when payload validation is disabled)
+
+        """
+        if self._combined_jmespath is not None:
+            key_data, payload_data = self._combined_jmespath.search(lambda_event)
+            return self._generate_hash(key_data), self._generate_hash(payload_data)
+        key_data = lambda_event
+        if self.event_key_jmespath:
+            key_data = self.event_key_compiled_jmespath.search(lambda_event)
+        payload_hash = ""
+        if self.payload_validation_enabled:
+            payload_hash = self._generate_hash(self.validation_key_jmespath.search(lambda_event))
+        return self._generate_hash(key_data), payload_hash
+
+    def _forget_event_hashes(self, lambda_event: Dict[str, Any]) -> None:
+        """
+        Drop the memoized hashes for lambda_event once the invocation flow has finished with it
+
+        Parameters
+        ----------
+        lambda_event: Dict[str, Any]
+            Lambda event
+
+        """
+        self._event_hash_cache.pop(id(lambda_event), None)
 
     def _generate_hash(self, data: Any) -> str:
         """
@@ -199,8 +443,31 @@ class BasePersistenceLayer(ABC):
             Hashed representation of the provided data
 
         """
-        hashed_data = self.hash_function(json.dumps(data, cls=Encoder).encode())
-        return hashed_data.hexdigest()
+        hasher = self._base_hasher.copy()
+        if isinstance(data, bytes):
+            # Callers that already hold the serialized payload can hash it as-is, skipping JSON serialization
+            hasher.update(data)
+        elif self.raw_string_hashing and isinstance(data, (str, int)) and not isinstance(data, bool):
+            hasher.update(data.encode() if isinstance(data, str) else str(data).encode())
+        else:
+            serialized = None
+            if orjson:
+                try:
+                    serialized = _orjson_dumps(data, option=_ORJSON_OPTIONS, default=_json_default)
+                except TypeError:
+                    # orjson rejects integers outside the 64-bit range; the stdlib encoder below handles
+                    # them and emits the same canonical bytes (and re-raises the same TypeError for types
+                    # _json_default rejects, such as datetimes)
+                    serialized = None
+            if serialized is not None:
+                hasher.update(serialized)
+            else:
+                # Stream encoder chunks straight into the hasher so large events never materialize as one
+                # big buffer
+                update = hasher.update
+                for chunk in _iterencode(data):
+                    update(chunk.encode())
+        return hasher.hexdigest()
 
     def _validate_payload(self, lambda_event: Dict[str, Any], data_record: DataRecord) -> None:
         """
@@ -233,9 +500,7 @@ class BasePersistenceLayer(ABC):
             unix timestamp of expiry date for idempotency record
 
         """
-        now = datetime.datetime.now()
-        period = datetime.timedelta(seconds=self.expires_after_seconds)
-        return int((now + period).timestamp())
+        return int(time.time()) + self.expires_after_seconds
 
     def _save_to_cache(self, data_record: DataRecord):
         """
@@ -255,24 +520,83 @@ class BasePersistenceLayer(ABC):
         """
         if not self.use_local_cache:
             return
-        if data_record.status == STATUS_CONSTANTS["INPROGRESS"]:
+        if data_record.status == _INPROGRESS:
             return
-        self._cache[data_record.idempotency_key] = data_record
+        # Cache eviction runs on the monotonic clock, which can't regress under NTP adjustments the way the
+        # wall-clock expiry_timestamp (still stored for DynamoDB TTL parity) can
+        monotonic_expiry = None
+        if data_record.expiry_timestamp:
+            # float() because DynamoDB deserializes number attributes as Decimal
+            monotonic_expiry = time.monotonic() + (float(data_record.expiry_timestamp) - time.time())
+        # Store a compact tuple instead of the DataRecord itself; a record is only materialized again on a
+        # cache hit, so idle cache entries don't carry full object overhead
+        self._cache[data_record.idempotency_key] = (
+            data_record._status,
+            data_record.expiry_timestamp,
+            data_record.response_data,
+            data_record.payload_hash,
+            monotonic_expiry,
+        )
 
     def _retrieve_from_cache(self, idempotency_key: str):
         if not self.use_local_cache:
-            return
-        cached_record = self._cache.get(idempotency_key)
-        if cached_record:
-            if not cached_record.is_expired:
-                return cached_record
-            logger.debug(f"Removing expired local cache record for idempotency key: {idempotency_key}")
-            self._delete_from_cache(idempotency_key)
+            return None
+        cached_entry = self._cache.get(idempotency_key)
+        if cached_entry is None:
+            return None
+        status, expiry_timestamp, response_data, payload_hash, monotonic_expiry = cached_entry
+        # Expiry check inlined from DataRecord.is_expired to keep the cache hit path to a single dict probe
+        if monotonic_expiry is not None and time.monotonic() > monotonic_expiry:
+            logger.debug("Removing expired local cache record for idempotency key: %s", idempotency_key)
+            self._cache.pop(idempotency_key, None)
+            return None
+        return DataRecord(
+            idempotency_key=idempotency_key,
+            status=status,
+            expiry_timestamp=expiry_timestamp,
+            response_data=response_data,
+            payload_hash=payload_hash,
+        )
 
     def _delete_from_cache(self, idempotency_key: str):
         if not self.use_local_cache:
             return
-        del self._cache[idempotency_key]
+        self._cache.pop(idempotency_key, None)
+
+    def _check_negative_cache(self, idempotency_key: str) -> None:
+        """
+        Raise IdempotencyItemNotFoundError without hitting the persistence store if a lookup for
+        idempotency_key failed within the last NEGATIVE_CACHE_TTL_SECONDS
+
+        Parameters
+        ----------
+        idempotency_key: str
+            hashed idempotency_key
+
+        Raises
+        ------
+        IdempotencyItemNotFoundError
+            A recent lookup for this key found no record
+        """
+        if not self.use_local_cache:
+            return
+        missed_at = self._negative_cache.get(idempotency_key)
+        if missed_at is None:
+            return
+        if time.monotonic() - missed_at <= NEGATIVE_CACHE_TTL_SECONDS:
+            logger.debug("Recent lookup miss found in negative cache for idempotency key: %s", idempotency_key)
+            raise IdempotencyItemNotFoundError
+        self._negative_cache.pop(idempotency_key, None)
+
+    def _save_to_negative_cache(self, idempotency_key: str) -> None:
+        if not self.use_local_cache:
+            return
+        self._negative_cache[idempotency_key] = time.monotonic()
+
+    def _delete_from_negative_cache(self, idempotency_key: str) -> None:
+        if not self.use_local_cache:
+            return
+        self._negative_cache.pop(idempotency_key, None)
 
     def save_success(self, event: Dict[str, Any], result: dict) -> None:
         """
@@ -289,18 +613,19 @@ class BasePersistenceLayer(ABC):
 
         data_record = DataRecord(
             idempotency_key=self._get_hashed_idempotency_key(event),
-            status=STATUS_CONSTANTS["COMPLETED"],
+            status=_COMPLETED,
             expiry_timestamp=self._get_expiry_timestamp(),
             response_data=response_data,
-            payload_hash=self._get_hashed_payload(event),
+            payload_hash=self._get_hashed_payload(event) if self.payload_validation_enabled else None,
         )
         logger.debug(
-            f"Lambda successfully executed. Saving record to persistence store with "
-            f"idempotency key: {data_record.idempotency_key}"
+            "Lambda successfully executed. Saving record to persistence store with idempotency key: %s",
+            data_record.idempotency_key,
         )
         self._update_record(data_record=data_record)
 
         self._save_to_cache(data_record)
+        self._forget_event_hashes(event)
 
     def save_inprogress(self, event: Dict[str, Any]) -> None:
         """
@@ -313,17 +638,22 @@ class BasePersistenceLayer(ABC):
         """
         data_record = DataRecord(
             idempotency_key=self._get_hashed_idempotency_key(event),
-            status=STATUS_CONSTANTS["INPROGRESS"],
+            status=_INPROGRESS,
             expiry_timestamp=self._get_expiry_timestamp(),
-            payload_hash=self._get_hashed_payload(event),
+            payload_hash=self._get_hashed_payload(event) if self.payload_validation_enabled else None,
         )
 
-        logger.debug(f"Saving in progress record for idempotency key: {data_record.idempotency_key}")
+        logger.debug("Saving in progress record for idempotency key: %s", data_record.idempotency_key)
 
         if self._retrieve_from_cache(idempotency_key=data_record.idempotency_key):
             raise IdempotencyItemAlreadyExistsError
 
-        self._put_record(data_record)
+        try:
+            self._put_record(data_record)
+        finally:
+            # Whether the put succeeded or the record turned out to already exist, any cached lookup miss for
+            # this key is stale now
+            self._delete_from_negative_cache(data_record.idempotency_key)
 
     def delete_record(self, event: Dict[str, Any], exception: Exception):
         """
@@ -339,12 +669,15 @@ class BasePersistenceLayer(ABC):
         data_record = DataRecord(idempotency_key=self._get_hashed_idempotency_key(event))
 
         logger.debug(
-            f"Lambda raised an exception ({type(exception).__name__}). Clearing in progress record in persistence "
-            f"store for idempotency key: {data_record.idempotency_key}"
+            "Lambda raised an exception (%s). Clearing in progress record in persistence store for "
+            "idempotency key: %s",
+            type(exception).__name__,
+            data_record.idempotency_key,
         )
         self._delete_record(data_record)
 
         self._delete_from_cache(data_record.idempotency_key)
+        self._forget_event_hashes(event)
 
     def get_record(self, event: Dict[str, Any]) -> DataRecord:
         """
@@ -372,11 +705,16 @@ class BasePersistenceLayer(ABC):
 
         cached_record = self._retrieve_from_cache(idempotency_key=idempotency_key)
         if cached_record:
-            logger.debug(f"Idempotency record found in cache with idempotency key: {idempotency_key}")
+            logger.debug("Idempotency record found in cache with idempotency key: %s", idempotency_key)
             self._validate_payload(event, cached_record)
             return cached_record
 
-        record = self._get_record(idempotency_key)
+        self._check_negative_cache(idempotency_key)
+        try:
+            record = self._get_record(idempotency_key)
+        except IdempotencyItemNotFoundError:
+            self._save_to_negative_cache(idempotency_key)
+            raise
 
         self._save_to_cache(data_record=record)
 
@@ -120,18 +120,18 @@ class DynamoDBPersistenceLayer(BasePersistenceLayer):
 
         now = datetime.datetime.now()
         try:
-            logger.debug(f"Putting record for idempotency key: {data_record.idempotency_key}")
+            logger.debug("Putting record for idempotency key: %s", data_record.idempotency_key)
             self.table.put_item(
                 Item=item,
                 ConditionExpression=f"attribute_not_exists({self.key_attr}) OR {self.expiry_attr} < :now",
                 ExpressionAttributeValues={":now": int(now.timestamp())},
             )
         except self._ddb_resource.meta.client.exceptions.ConditionalCheckFailedException:
-            logger.debug(f"Failed to put record for already existing idempotency key: {data_record.idempotency_key}")
+            logger.debug("Failed to put record for already existing idempotency key: %s", data_record.idempotency_key)
             raise IdempotencyItemAlreadyExistsError
 
     def _update_record(self, data_record: DataRecord):
-        logger.debug(f"Updating record for idempotency key: {data_record.idempotency_key}")
+        logger.debug("Updating record for idempotency key: %s", data_record.idempotency_key)
         update_expression = "SET #response_data = :response_data, #expiry = :expiry, #status = :status"
         expression_attr_values = {
             ":expiry": data_record.expiry_timestamp,
@@ -159,5 +159,5 @@ class DynamoDBPersistenceLayer(BasePersistenceLayer):
         self.table.update_item(**kwargs)
 
     def _delete_record(self, data_record: DataRecord) -> None:
-        logger.debug(f"Deleting record for idempotency key: {data_record.idempotency_key}")
+        logger.debug("Deleting record for idempotency key: %s", data_record.idempotency_key)
         self.table.delete_item(Key={self.key_attr: data_record.idempotency_key},)
@@ -133,7 +133,7 @@ def expected_params_put_item_with_validation(hashed_idempotency_key, hashed_vali
 def hashed_idempotency_key(lambda_apigw_event, default_jmespath):
     compiled_jmespath = jmespath.compile(default_jmespath)
     data = compiled_jmespath.search(lambda_apigw_event)
-    return hashlib.md5(json.dumps(data).encode()).hexdigest()
+    return hashlib.md5(json.dumps(data, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
 
 
 @pytest.fixture
@@ -141,12 +141,14 @@ def hashed_idempotency_key_with_envelope(lambda_apigw_event):
     event = unwrap_event_from_envelope(
         data=lambda_apigw_event, envelope=envelopes.API_GATEWAY_HTTP, jmespath_options={}
     )
-    return hashlib.md5(json.dumps(event).encode()).hexdigest()
+    return hashlib.md5(json.dumps(event, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
 
 
 @pytest.fixture
 def hashed_validation_key(lambda_apigw_event):
-    return hashlib.md5(json.dumps(lambda_apigw_event["requestContext"]).encode()).hexdigest()
+    return hashlib.md5(
+        json.dumps(lambda_apigw_event["requestContext"], sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
 
 
 @pytest.fixture
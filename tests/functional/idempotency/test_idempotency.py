@@ -1,17 +1,24 @@
 import copy
+import datetime
+import hashlib
 import sys
+from decimal import Decimal
+from types import SimpleNamespace
 
 import pytest
 from botocore import stub
 
+from aws_lambda_powertools.utilities.idempotency import DynamoDBPersistenceLayer
 from aws_lambda_powertools.utilities.idempotency.exceptions import (
     IdempotencyAlreadyInProgressError,
     IdempotencyInconsistentStateError,
     IdempotencyInvalidStatusError,
+    IdempotencyItemNotFoundError,
     IdempotencyPersistenceLayerError,
     IdempotencyValidationError,
 )
 from aws_lambda_powertools.utilities.idempotency.idempotency import idempotent
+from aws_lambda_powertools.utilities.idempotency.persistence import base as persistence_base
 from aws_lambda_powertools.utilities.idempotency.persistence.base import DataRecord
 from aws_lambda_powertools.utilities.validation import envelopes, validator
 
@@ -229,7 +236,7 @@ def test_idempotent_lambda_first_execution_cached(
     retrieve_from_cache_spy.assert_called_once()
     save_to_cache_spy.assert_called_once()
     assert save_to_cache_spy.call_args[0][0].status == "COMPLETED"
-    assert persistence_store._cache.get(hashed_idempotency_key).status == "COMPLETED"
+    assert persistence_store._cache.get(hashed_idempotency_key)[0] == "COMPLETED"
 
     # This lambda call should not call AWS API
     lambda_handler(lambda_apigw_event, {})
@@ -610,6 +617,228 @@ def test_in_progress_never_saved_to_cache(persistence_store):
     assert persistence_store._cache.get("key") is None
 
 
+def test_resolve_hash_function_optional_algorithms(monkeypatch):
+    # GIVEN the optional xxhash and blake3 packages are importable
+    xxh3_constructor = object()
+    blake3_constructor = object()
+    monkeypatch.setattr(persistence_base, "xxhash", SimpleNamespace(xxh3_128=xxh3_constructor))
+    monkeypatch.setattr(persistence_base, "blake3", SimpleNamespace(blake3=blake3_constructor))
+
+    # WHEN resolving the documented hash function names
+    # THEN the matching package constructors are returned
+    assert persistence_base.BasePersistenceLayer._resolve_hash_function("xxh3_128") is xxh3_constructor
+    assert persistence_base.BasePersistenceLayer._resolve_hash_function("blake3") is blake3_constructor
+
+
+@pytest.mark.parametrize("hash_function,module_attr", [("xxh3_128", "xxhash"), ("blake3", "blake3")])
+def test_resolve_hash_function_missing_optional_package(monkeypatch, hash_function, module_attr):
+    # GIVEN the optional package backing the hash function is not installed
+    monkeypatch.setattr(persistence_base, module_attr, None)
+
+    # WHEN resolving the hash function name
+    # THEN an ImportError names the missing package
+    with pytest.raises(ImportError, match=module_attr):
+        persistence_base.BasePersistenceLayer._resolve_hash_function(hash_function)
+
+
+def test_resolve_hash_function_hashlib_fallback():
+    # GIVEN any other hash function name
+    # WHEN resolving it
+    # THEN it resolves through hashlib as before
+    assert persistence_base.BasePersistenceLayer._resolve_hash_function("md5") is hashlib.md5
+    assert persistence_base.BasePersistenceLayer._resolve_hash_function("sha256") is hashlib.sha256
+
+
+@pytest.mark.parametrize("persistence_store", [{"use_local_cache": False}], indirect=True)
+def test_generate_hash_identical_with_and_without_orjson(persistence_store, monkeypatch):
+    # GIVEN a payload using the Encoder-supported Decimal types, including NaN
+    data = {"decimal": Decimal("2.5"), "decimal_NaN": Decimal("NaN"), "nested": {"message": "test"}}
+
+    # WHEN hashing with the optional orjson serializer and with the stdlib fallback
+    orjson_hash = persistence_store._generate_hash(data)
+    monkeypatch.setattr(persistence_base, "orjson", None)
+    stdlib_hash = persistence_store._generate_hash(data)
+
+    # THEN both paths generate the same hash, so installing or removing orjson can't change stored keys
+    assert orjson_hash == stdlib_hash
+
+
+@pytest.mark.parametrize("persistence_store", [{"use_local_cache": False}], indirect=True)
+def test_generate_hash_rejects_datetime_on_both_paths(persistence_store, monkeypatch):
+    # GIVEN a payload containing a type neither serializer is meant to support
+    data = {"timestamp": datetime.datetime.now()}
+
+    # WHEN hashing with the optional orjson serializer and with the stdlib fallback
+    # THEN both paths reject it with TypeError rather than orjson silently serializing it
+    with pytest.raises(TypeError):
+        persistence_store._generate_hash(data)
+    monkeypatch.setattr(persistence_base, "orjson", None)
+    with pytest.raises(TypeError):
+        persistence_store._generate_hash(data)
+
+
+@pytest.mark.parametrize("persistence_store", [{"use_local_cache": False}], indirect=True)
+def test_generate_hash_big_int_identical_with_and_without_orjson(persistence_store, monkeypatch):
+    # GIVEN a payload containing an integer outside the 64-bit range, which orjson refuses to serialize
+    data = {"n": 123456789012345678901234567890}
+
+    # WHEN hashing with the optional orjson serializer and with the stdlib fallback
+    orjson_hash = persistence_store._generate_hash(data)
+    monkeypatch.setattr(persistence_base, "orjson", None)
+    stdlib_hash = persistence_store._generate_hash(data)
+
+    # THEN the orjson path falls back to the stdlib encoder instead of raising, and both hashes match
+    assert orjson_hash == stdlib_hash
+    assert orjson_hash == hashlib.md5(b'{"n":123456789012345678901234567890}').hexdigest()
+
+
+@pytest.mark.parametrize("persistence_store", [{"use_local_cache": False}], indirect=True)
+def test_generate_hash_normalizes_non_finite_floats(persistence_store, monkeypatch):
+    # GIVEN a payload containing non-finite float literals, which json.loads happily produces
+    data = {"nan": float("nan"), "inf": float("inf"), "neg_inf": float("-inf")}
+
+    # WHEN hashing with the optional orjson serializer and with the stdlib fallback
+    orjson_hash = persistence_store._generate_hash(data)
+    monkeypatch.setattr(persistence_base, "orjson", None)
+    stdlib_hash = persistence_store._generate_hash(data)
+
+    # THEN both paths serialize them as null, so hashes match whether or not orjson is installed
+    assert orjson_hash == stdlib_hash
+    assert orjson_hash == persistence_store._generate_hash({"nan": None, "inf": None, "neg_inf": None})
+
+
+def test_raw_string_hashing_fast_path(config):
+    # GIVEN a persistence layer with raw_string_hashing enabled
+    persistence_store = DynamoDBPersistenceLayer(table_name=TABLE_NAME, boto_config=config, raw_string_hashing=True)
+
+    # WHEN hashing scalar key data
+    # THEN str and int values hash their raw representation, skipping JSON serialization
+    assert persistence_store._generate_hash("order-123") == hashlib.md5(b"order-123").hexdigest()
+    assert persistence_store._generate_hash(1500) == hashlib.md5(b"1500").hexdigest()
+    # AND bool stays on the JSON path instead of hashing as "True"/"False"
+    assert persistence_store._generate_hash(True) == hashlib.md5(b"true").hexdigest()
+
+
+def test_raw_string_hashing_disabled_by_default(config):
+    # GIVEN a persistence layer with default settings
+    persistence_store = DynamoDBPersistenceLayer(table_name=TABLE_NAME, boto_config=config)
+
+    # WHEN hashing scalar key data
+    # THEN values are JSON-serialized before hashing, as before
+    assert persistence_store._generate_hash("order-123") == hashlib.md5(b'"order-123"').hexdigest()
+    assert persistence_store._generate_hash(1500) == hashlib.md5(b"1500").hexdigest()
+
+
+@pytest.mark.parametrize("persistence_store", [{"use_local_cache": False}], indirect=True)
+def test_event_hash_memo_verifies_event_identity(persistence_store, lambda_apigw_event, hashed_idempotency_key):
+    # GIVEN a memo entry whose id() key was recycled from a different, already garbage-collected event
+    stale_event = {"body": "some other event"}
+    persistence_store._event_hash_cache[id(lambda_apigw_event)] = (stale_event, ("stale-key", ""))
+
+    # WHEN hashing the event
+    # THEN the stale entry is recomputed rather than returning the other event's hashes
+    assert persistence_store._get_hashed_idempotency_key(lambda_apigw_event) == hashed_idempotency_key
+
+
+@pytest.mark.parametrize("persistence_store", [{"use_local_cache": True}], indirect=True)
+def test_negative_cache_short_circuits_repeat_miss(persistence_store, lambda_apigw_event, hashed_idempotency_key):
+    # GIVEN a lookup that found no record in the persistence store
+    stubber = stub.Stubber(persistence_store.table.meta.client)
+    expected_params = {"TableName": TABLE_NAME, "Key": {"id": hashed_idempotency_key}, "ConsistentRead": True}
+    stubber.add_response("get_item", {}, expected_params)
+    stubber.activate()
+
+    with pytest.raises(IdempotencyItemNotFoundError):
+        persistence_store.get_record(lambda_apigw_event)
+
+    # WHEN the same key is looked up again within NEGATIVE_CACHE_TTL_SECONDS
+    # THEN the cached miss is raised again without another store round-trip (only one get_item was stubbed)
+    with pytest.raises(IdempotencyItemNotFoundError):
+        persistence_store.get_record(lambda_apigw_event)
+
+    stubber.assert_no_pending_responses()
+    stubber.deactivate()
+
+
+@pytest.mark.parametrize("persistence_store", [{"use_local_cache": True}], indirect=True)
+def test_negative_cache_entry_expires_after_ttl(
+    persistence_store, lambda_apigw_event, timestamp_future, serialized_lambda_response, hashed_idempotency_key
+):
+    # GIVEN a cached miss older than NEGATIVE_CACHE_TTL_SECONDS
+    stubber = stub.Stubber(persistence_store.table.meta.client)
+    expected_params = {"TableName": TABLE_NAME, "Key": {"id": hashed_idempotency_key}, "ConsistentRead": True}
+    ddb_response = {
+        "Item": {
+            "id": {"S": hashed_idempotency_key},
+            "expiration": {"N": timestamp_future},
+            "data": {"S": serialized_lambda_response},
+            "status": {"S": "COMPLETED"},
+        }
+    }
+    stubber.add_response("get_item", {}, expected_params)
+    stubber.add_response("get_item", ddb_response, copy.deepcopy(expected_params))
+    stubber.activate()
+
+    with pytest.raises(IdempotencyItemNotFoundError):
+        persistence_store.get_record(lambda_apigw_event)
+    persistence_store._negative_cache[hashed_idempotency_key] -= persistence_base.NEGATIVE_CACHE_TTL_SECONDS + 1
+
+    # WHEN the key is looked up again
+    record = persistence_store.get_record(lambda_apigw_event)
+
+    # THEN the store is queried again instead of raising from the expired cached miss
+    assert record.status == "COMPLETED"
+    stubber.assert_no_pending_responses()
+    stubber.deactivate()
+
+
+@pytest.mark.parametrize("persistence_store", [{"use_local_cache": True}], indirect=True)
+def test_negative_cache_invalidated_on_put(
+    persistence_store, lambda_apigw_event, expected_params_put_item, hashed_idempotency_key
+):
+    # GIVEN a cached miss for the event's idempotency key
+    stubber = stub.Stubber(persistence_store.table.meta.client)
+    expected_params_get_item = {"TableName": TABLE_NAME, "Key": {"id": hashed_idempotency_key}, "ConsistentRead": True}
+    stubber.add_response("get_item", {}, expected_params_get_item)
+    stubber.add_response("put_item", {}, expected_params_put_item)
+    stubber.activate()
+
+    with pytest.raises(IdempotencyItemNotFoundError):
+        persistence_store.get_record(lambda_apigw_event)
+    assert hashed_idempotency_key in persistence_store._negative_cache
+
+    # WHEN a record for the key is saved
+    persistence_store.save_inprogress(lambda_apigw_event)
+
+    # THEN the cached miss is dropped so subsequent lookups see fresh store state
+    assert hashed_idempotency_key not in persistence_store._negative_cache
+    stubber.assert_no_pending_responses()
+    stubber.deactivate()
+
+
+@pytest.mark.parametrize("persistence_store", [{"use_local_cache": True}], indirect=True)
+def test_repeated_misses_surface_as_inconsistent_state_error(persistence_store, lambda_apigw_event, lambda_response):
+    # GIVEN a store that reports the record as existing on put but missing on every get
+    stubber = stub.Stubber(persistence_store.table.meta.client)
+    for _ in range(3):
+        stubber.add_client_error("put_item", "ConditionalCheckFailedException")
+        stubber.add_response("get_item", {})
+    stubber.activate()
+
+    @idempotent(persistence_store=persistence_store)
+    def lambda_handler(event, context):
+        return lambda_response
+
+    # WHEN the decorated handler exhausts its retries
+    # THEN the miss surfaces as IdempotencyInconsistentStateError, and every retry still queried the store
+    # because save_inprogress invalidates the cached miss before get_record runs
+    with pytest.raises(IdempotencyInconsistentStateError):
+        lambda_handler(lambda_apigw_event, {})
+
+    stubber.assert_no_pending_responses()
+    stubber.deactivate()
+
+
 @pytest.mark.parametrize("persistence_store", [{"use_local_cache": False}], indirect=True)
 def test_user_local_disabled(persistence_store):
     # GIVEN a persistence_store with use_local_cache = False